@@ -1,14 +1,15 @@
 import calendar
 import datetime
+import functools
 import os
 import uuid
 from decimal import Decimal
 from http.cookies import SimpleCookie
 
 
+import boto3
 from aws_lambda_powertools import Logger, Tracer
-
-import cognitojwt
+from botocore.config import Config
 
 logger = Logger()
 tracer = Tracer()
@@ -20,6 +21,16 @@ HEADERS = {
     "Access-Control-Allow-Credentials": True,
 }
 
+# Reuse TCP connections to AWS services across warm invocations
+BOTO_CONFIG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=50,
+    retries={"max_attempts": 3, "mode": "standard"},
+)
+
+# A single session per container, so credentials are only resolved once however many resources are created
+session = boto3.session.Session()
+
 
 class NotFoundException(Exception):
     pass
@@ -47,11 +58,47 @@ def generate_ttl(days=1):
     return calendar.timegm(future.utctimetuple())
 
 
+@functools.lru_cache(maxsize=None)
+def get_resource(service_name):
+    """
+    Get a boto3 resource for the given service, created from the shared session once per container
+    """
+    return session.resource(service_name, config=BOTO_CONFIG)
+
+
+@functools.lru_cache(maxsize=None)
+def get_client(service_name):
+    """
+    Get a low-level boto3 client for the given service, created from the shared session once per container
+    """
+    return session.client(service_name, config=BOTO_CONFIG)
+
+
+def get_table():
+    """
+    Get the shopping cart DynamoDB Table
+    """
+    return get_resource("dynamodb").Table(os.environ["TABLE_NAME"])
+
+
+def warm_connection(client):
+    """
+    Make a cheap DynamoDB call during the INIT phase, so the first invocation doesn't pay for opening the connection
+    """
+    try:
+        client.describe_table(TableName=os.environ["TABLE_NAME"])
+    except Exception:  # Best effort only, this must never stop the function from initialising
+        logger.debug("Failed to warm DynamoDB connection", exc_info=True)
+
+
 @tracer.capture_method
 def get_user_sub(jwt_token):
     """
     Validate JWT claims & retrieve user identifier
     """
+    # Imported here rather than at module level since most requests are anonymous, which keeps it out of cold starts
+    import cognitojwt
+
     try:
         verified_claims = cognitojwt.decode(
             jwt_token, os.environ["AWS_REGION"], os.environ["USERPOOL_ID"]
@@ -62,29 +109,40 @@ def get_user_sub(jwt_token):
     return verified_claims.get("sub")
 
 
-@tracer.capture_method
-def get_cart_id(event_headers):
+@functools.lru_cache(maxsize=1024)
+def parse_cart_id(cookie_header):
     """
-    Retrieve cart_id from cookies if it exists, otherwise set and return it
+    Parse cart_id from a cookie header, returning None if it isn't set
     """
     cookie = SimpleCookie()
+    cookie.load(cookie_header)
     try:
-        cookie.load(event_headers["cookie"])
-        cart_cookie = cookie["cartId"].value
-        generated = False
+        return cookie["cartId"].value
     except KeyError:
-        cart_cookie = str(uuid.uuid4())
-        generated = True
-
-    return cart_cookie, generated
+        return None
 
 
 @tracer.capture_method
-def get_headers(cart_id):
+def get_cart_id(cookie_header):
     """
-    Get the headers to add to response data
+    Retrieve cart_id from cookies if it exists, otherwise generate and return it
     """
-    headers = HEADERS
+    cart_cookie = parse_cart_id(cookie_header) if cookie_header else None
+    if cart_cookie is None:
+        # Never cached, every request without a cart cookie needs its own cart
+        return str(uuid.uuid4()), True
+
+    return cart_cookie, False
+
+
+@functools.lru_cache(maxsize=512)
+def get_headers(cart_id=None):
+    """
+    Get the headers to add to response data. The returned dict is shared between calls, so must not be modified.
+    """
+    if cart_id is None:
+        return HEADERS
+
     cookie = SimpleCookie()
     cookie["cartId"] = cart_id
     cookie["cartId"]["max-age"] = (60 * 60) * 24  # 1 day
@@ -92,5 +150,4 @@ def get_headers(cart_id):
     cookie["cartId"]["httponly"] = True
     cookie["cartId"]["samesite"] = "None"
     cookie["cartId"]["path"] = "/"
-    headers["Set-Cookie"] = cookie["cartId"].OutputString()
-    return headers
+    return {**HEADERS, "Set-Cookie": cookie["cartId"].OutputString()}
@@ -1,13 +1,20 @@
-import json
 import os
 
+import orjson
 from aws_lambda_powertools import Logger, Tracer
 
 logger = Logger()
 tracer = Tracer()
 
-with open("product_list.json", "r") as product_list:
-    product_list = json.load(product_list)
+# Generated from product_list.json at build time, see scripts/build_product_index.py
+try:
+    with open("product_index.json", "rb") as product_index:
+        PRODUCT_INDEX = orjson.loads(product_index.read())
+except FileNotFoundError:
+    # Built without the make target, e.g. a plain sam build or sam local invoke, so index the product list instead
+    logger.warning("product_index.json not found, building the index from product_list.json")
+    with open("product_list.json", "rb") as product_list:
+        PRODUCT_INDEX = {product["productId"]: product for product in orjson.loads(product_list.read())}
 
 HEADERS = {
     "Access-Control-Allow-Origin": os.environ.get("ALLOWED_ORIGIN"),
@@ -16,7 +23,7 @@ HEADERS = {
 }
 
 
-@logger.inject_lambda_context(log_event=True)
+@logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     """
@@ -24,19 +31,15 @@ def lambda_handler(event, context):
     """
     path_params = event["pathParameters"]
     product_id = path_params.get("product_id")
-    logger.debug(f"Retriving product with id: {product_id}")
-    product = next(
-        (item for item in product_list if item["productId"]
-         == product_id), None
-    )
+    logger.debug("Retriving product with id: %s", product_id)
+    product = PRODUCT_INDEX.get(product_id)
 
     if product is None:
-        logger.error(f"ERROR: get_product: no match found for product id: {product_id}")
+        logger.error("ERROR: get_product: no match found for product id: %s", product_id)
 
-    logger.debug(
-        f"Successfully fetched product detail with id - {product_id}: {product}")
+    logger.debug("Successfully fetched product detail with id - %s: %s", product_id, product)
     return {
         "statusCode": 200,
         "headers": HEADERS,
-        "body": json.dumps({"product": product}),
+        "body": orjson.dumps({"product": product}).decode(),
     }
@@ -1,14 +1,14 @@
-import json
 import os
 
+import orjson
 from aws_lambda_powertools import Logger, Tracer
 from itertools import groupby
 
 logger = Logger()
 tracer = Tracer()
 
-with open('product_list.json', 'r') as product_list:
-    product_list = json.load(product_list)
+with open('product_list.json', 'rb') as product_list:
+    product_list = orjson.loads(product_list.read())
 
 HEADERS = {
     "Access-Control-Allow-Origin": os.environ.get("ALLOWED_ORIGIN"),
@@ -21,25 +21,25 @@ def key_func(k):
     return k.get('category', '')
 
 
-@logger.inject_lambda_context(log_event=True)
+@logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     """
     Return list of all products.
     """
     logger.info("Fetching product list")
-    logger.info(f"Total items avaiable in shop : {len(product_list)}")
+    logger.info("Total items avaiable in shop : %s", len(product_list))
 
     # sort INFO data by 'company' key.
     product_list_sorted = sorted(product_list, key=key_func)
 
-    logger.info(f"Listing items per category : ")
+    logger.debug("Listing items per category : ")
     for key, value in groupby(product_list_sorted, key_func):
         value = list(value)
-        logger.info(f"Category : {key} , Items available : {len(value)}")
+        logger.debug("Category : %s , Items available : %s", key, len(value))
 
     return {
         "statusCode": 200,
         "headers": HEADERS,
-        "body": json.dumps({"products": product_list}),
+        "body": orjson.dumps({"products": product_list}).decode(),
     }
@@ -0,0 +1,23 @@
+"""
+Build product_index.json for the product mock service, mapping each productId in product_list.json to its product.
+"""
+import json
+import os
+
+SERVICE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "product-mock-service"
+)
+
+
+def main():
+    with open(os.path.join(SERVICE_DIR, "product_list.json"), "r") as product_list:
+        product_list = json.load(product_list)
+
+    product_index = {product["productId"]: product for product in product_list}
+
+    with open(os.path.join(SERVICE_DIR, "product_index.json"), "w") as product_index_file:
+        json.dump(product_index, product_index_file)
+
+
+if __name__ == "__main__":
+    main()
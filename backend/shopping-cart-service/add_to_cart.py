@@ -1,15 +1,17 @@
-import json
 import os
 
-import boto3
+import orjson
 from aws_lambda_powertools import Logger, Metrics, Tracer
+from boto3.dynamodb.types import TypeSerializer
 
 from shared import (
     NotFoundException,
     generate_ttl,
     get_cart_id,
+    get_client,
     get_headers,
     get_user_sub,
+    warm_connection,
 )
 from utils import get_product_from_external_service
 
@@ -17,13 +19,23 @@ logger = Logger()
 tracer = Tracer()
 metrics = Metrics()
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["TABLE_NAME"])
+# Use the low-level client with pre-marshalled values, skipping the resource layer's per call parameter transformation
+client = get_client("dynamodb")
+table_name = os.environ["TABLE_NAME"]
+serializer = TypeSerializer()
+warm_connection(client)
 product_service_url = os.environ["PRODUCT_SERVICE_URL"]
 
+EXPRESSION_ATTRIBUTE_NAMES = {
+    "#quantity": "quantity",
+    "#expirationTime": "expirationTime",
+    "#productDetail": "productDetail",
+}
+UPDATE_EXPRESSION = "ADD #quantity :val SET #expirationTime = :ttl, #productDetail = :productDetail"
+
 
 @metrics.log_metrics(capture_cold_start_metric=True)
-@logger.inject_lambda_context(log_event=True)
+@logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     """
@@ -32,20 +44,20 @@ def lambda_handler(event, context):
     """
 
     try:
-        request_payload = json.loads(event["body"])
+        request_payload = orjson.loads(event["body"])
     except KeyError:
         logger.error("add_to_cart: KeyError: no request payload")
         return {
             "statusCode": 400,
             "headers": get_headers(),
-            "body": json.dumps({"message": "No Request payload"}),
+            "body": orjson.dumps({"message": "No Request payload"}).decode(),
         }
     product_id = request_payload["productId"]
-    quantity = request_payload.get("quantity", 1)
-    cart_id, _ = get_cart_id(event["headers"])
+    quantity = int(request_payload.get("quantity", 1))
+    cart_id, _ = get_cart_id(event["headers"].get("cookie"))
 
-    logger.info(f"Add the product : ${product_id} to the cart - ${cart_id}")
-    logger.info(f"Requested quantity : {abs(quantity)}")
+    logger.info("Add the product : %s to the cart - %s", product_id, cart_id)
+    logger.info("Requested quantity : %s", abs(quantity))
 
     # Because this method can be called anonymously, we need to check there's a logged in user
     user_sub = None
@@ -55,13 +67,13 @@ def lambda_handler(event, context):
 
     try:
         product = get_product_from_external_service(product_id)
-        logger.info(f"Product details : {product}")
+        logger.debug("Product details : %s", product)
     except NotFoundException:
-        logger.error(f"No product found with given id : {product_id}")
+        logger.error("No product found with given id : %s", product_id)
         return {
             "statusCode": 404,
             "headers": get_headers(cart_id=cart_id),
-            "body": json.dumps({"message": "product not found"}),
+            "body": orjson.dumps({"message": "product not found"}).decode(),
         }
 
     if user_sub:
@@ -70,56 +82,36 @@ def lambda_handler(event, context):
         ttl = generate_ttl(
             7
         )  # Set a longer ttl for logged in users - we want to keep their cart for longer.
-        logger.info(f"Authenticated user in session: {pk}")
+        logger.info("Authenticated user in session: %s", pk)
     else:
         logger.info("Unauthenticated user")
         pk = f"cart#{cart_id}"
         ttl = generate_ttl()
 
-    if int(quantity) < 0:
-        logger.info(
-            f"Product#{product_id} added to cart. Time to live in cart : {ttl}")
-        table.update_item(
-            Key={"pk": pk, "sk": f"product#{product_id}"},
-            ExpressionAttributeNames={
-                "#quantity": "quantity",
-                "#expirationTime": "expirationTime",
-                "#productDetail": "productDetail",
-            },
-            ExpressionAttributeValues={
-                ":val": quantity,
-                ":ttl": ttl,
-                ":productDetail": product,
-                ":limit": abs(quantity),
-            },
-            UpdateExpression="ADD #quantity :val SET #expirationTime = :ttl, #productDetail = :productDetail",
-            # Prevent quantity less than 0
-            ConditionExpression="quantity >= :limit",
-        )
-    else:
-        ttl = generate_ttl()
-        logger.info(
-            f"Product#{product_id} added to cart. Time to live in cart : {ttl}")
-        table.update_item(
-            Key={"pk": pk, "sk": f"product#{product_id}"},
-            ExpressionAttributeNames={
-                "#quantity": "quantity",
-                "#expirationTime": "expirationTime",
-                "#productDetail": "productDetail",
-            },
-            ExpressionAttributeValues={
-                ":val": quantity,
-                ":ttl": ttl,
-                ":productDetail": product,
-            },
-            UpdateExpression="ADD #quantity :val SET #expirationTime = :ttl, #productDetail = :productDetail",
-        )
+    update_kwargs = {
+        "TableName": table_name,
+        "Key": {"pk": {"S": pk}, "sk": {"S": f"product#{product_id}"}},
+        "ExpressionAttributeNames": EXPRESSION_ATTRIBUTE_NAMES,
+        "ExpressionAttributeValues": {
+            ":val": {"N": str(quantity)},
+            ":ttl": {"N": str(ttl)},
+            ":productDetail": serializer.serialize(product),
+        },
+        "UpdateExpression": UPDATE_EXPRESSION,
+    }
+    if quantity < 0:
+        # Prevent quantity less than 0
+        update_kwargs["ConditionExpression"] = "quantity >= :limit"
+        update_kwargs["ExpressionAttributeValues"][":limit"] = {"N": str(abs(quantity))}
+
+    logger.info("Product#%s added to cart. Time to live in cart : %s", product_id, ttl)
+    client.update_item(**update_kwargs)
     metrics.add_metric(name="CartUpdated", unit="Count", value=1)
 
     return {
         "statusCode": 200,
         "headers": get_headers(cart_id),
-        "body": json.dumps(
+        "body": orjson.dumps(
             {"productId": product_id, "message": "product added to cart"}
-        ),
+        ).decode(),
     }
@@ -1,73 +1,116 @@
-import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
+import orjson
 from aws_lambda_powertools import Logger, Metrics, Tracer
 from boto3.dynamodb.conditions import Key
 
-from shared import get_cart_id, get_headers, handle_decimal_type
+from shared import (
+    get_cart_id,
+    get_headers,
+    get_table,
+    handle_decimal_type,
+    warm_connection,
+)
 
 logger = Logger()
 tracer = Tracer()
 metrics = Metrics()
 
-dynamodb = boto3.resource("dynamodb")
-
 logger.debug("Initializing DDB Table %s", os.environ["TABLE_NAME"])
-table = dynamodb.Table(os.environ["TABLE_NAME"])
+table = get_table()
+warm_connection(table.meta.client)
+
+DDB_BATCH_SIZE = 25  # Maximum number of requests DynamoDB accepts in a single BatchWriteItem call
+MAX_DELETE_WORKERS = 8
+DDB_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.05  # seconds, doubled after every attempt
+RETRY_MAX_DELAY = 1  # seconds
+
+
+def delete_items(items):
+    """
+    Delete up to DDB_BATCH_SIZE items from the cart table in a single request, resubmitting any left unprocessed
+    up to DDB_MAX_ATTEMPTS times.
+    """
+    request_items = {
+        table.name: [
+            {"DeleteRequest": {"Key": {"pk": item["pk"], "sk": item["sk"]}}}
+            for item in items
+        ]
+    }
+    for attempt in range(DDB_MAX_ATTEMPTS):
+        if attempt:
+            # Back off before resubmitting, unprocessed items usually mean the table is being throttled
+            time.sleep(min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY))
+        logger.info("Remove %s checked out items from cart", len(request_items[table.name]))
+        response = table.meta.client.batch_write_item(RequestItems=request_items)
+        request_items = response.get("UnprocessedItems")
+        if not request_items:
+            return
+
+    logger.error("Failed to remove %s checked out items from cart", len(request_items[table.name]))
+    raise RuntimeError(f"Failed to remove {len(request_items[table.name])} checked out items from cart")
 
 
 @metrics.log_metrics(capture_cold_start_metric=True)
-@logger.inject_lambda_context(log_event=True)
+@logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     """
     Update cart table to use user identifier instead of anonymous cookie value as a key. This will be called when a user
     is logged in.
     """
-    cart_id, _ = get_cart_id(event["headers"])
+    cart_id, _ = get_cart_id(event["headers"].get("cookie"))
 
     try:
         # Because this method is authorized at API gateway layer, we don't need to validate the JWT claims here
         user_id = event["requestContext"]["authorizer"]["claims"]["sub"]
-        logger.info(f"Checkout items in cart for user : {user_id}")
+        logger.info("Checkout items in cart for user : %s", user_id)
     except KeyError:
         logger.error("checkout_cart: KeyError: Unauthorized token")
         return {
             "statusCode": 400,
             "headers": get_headers(cart_id),
-            "body": json.dumps({"message": "Invalid user"}),
+            "body": orjson.dumps({"message": "Invalid user"}).decode(),
         }
 
     # Get all cart items belonging to the user's identity
     response = table.query(
         KeyConditionExpression=Key("pk").eq(f"user#{user_id}")
         & Key("sk").begins_with("product#"),
+        # expirationTime is neither needed to delete items nor returned in the response
+        ProjectionExpression="pk,sk,quantity,productDetail",
         # Perform a strongly consistent read here to ensure we get correct and up to date cart
         ConsistentRead=True,
     )
 
     cart_items = response.get("Items")
-    logger.info(
-        f"Fetch existing items in the user#{user_id} cart : {len(cart_items)}")
-    # batch_writer will be used to update status for cart entries belonging to the user
-    with table.batch_writer() as batch:
-        for item in cart_items:
-            pk = str(item.get("pk", ""))
-            logger.info(f"Checkout the item in cart : {pk}")
-            # Delete ordered items
-            batch.delete_item(Key={"pk": pk, "sk": item["sk"]})
-            logger.info(f"Remove the checked out item from cart : {pk}")
+    logger.info("Fetch existing items in the user#%s cart : %s", user_id, len(cart_items))
+    # Delete ordered items, sending each BatchWriteItem request from its own thread since they don't depend on
+    # each other
+    chunks = [
+        cart_items[i:i + DDB_BATCH_SIZE] for i in range(0, len(cart_items), DDB_BATCH_SIZE)
+    ]
+    if len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=MAX_DELETE_WORKERS) as executor:
+            list(executor.map(delete_items, chunks))  # Consume results so any exception is raised here
+    elif chunks:
+        # Most carts fit in a single request, which doesn't need any threads
+        delete_items(chunks[0])
 
     metrics.add_metric(name="CartCheckedOut", unit="Count", value=1)
-    logger.info({"action": "CartCheckedOut", "cartItems": cart_items})
     logger.info(
-        f"Successfully checked out all items from the user#{user_id} cart")
+        {"action": "CartCheckedOut", "itemCount": len(cart_items), "cartItems": [item["sk"] for item in cart_items]}
+    )
+    logger.debug({"action": "CartCheckedOut", "cartItems": cart_items})
+    logger.info("Successfully checked out all items from the user#%s cart", user_id)
 
     return {
         "statusCode": 200,
         "headers": get_headers(cart_id),
-        "body": json.dumps(
+        "body": orjson.dumps(
             {"products": response.get("Items")}, default=handle_decimal_type
-        ),
+        ).decode(),
     }
@@ -1,15 +1,14 @@
-import os
 from collections import Counter
 
-import boto3
 from aws_lambda_powertools import Logger, Tracer
 from boto3.dynamodb import types
 
+from shared import get_table
+
 logger = Logger()
 tracer = Tracer()
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["TABLE_NAME"])
+table = get_table()
 
 deserializer = types.TypeDeserializer()
 
@@ -22,7 +21,7 @@ def dynamodb_to_python(dynamodb_item):
     return {k: deserializer.deserialize(v) for k, v in dynamodb_item.items()}
 
 
-@logger.inject_lambda_context(log_event=True)
+@logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     """
@@ -35,12 +34,14 @@ def lambda_handler(event, context):
     for record in records:
         keys = dynamodb_to_python(record["dynamodb"]["Keys"])
         event_name = record.get("eventName", "")
-        logger.info(f"Current dynamo event - {event_name}")
+        logger.debug("Current dynamo event - %s", event_name)
         # NewImage record only exists if the event is INSERT or MODIFY
         if record["eventName"] in ("INSERT", "MODIFY"):
             new_image = dynamodb_to_python(record["dynamodb"]["NewImage"])
-            logger.info(
-                f"New image for dynamo db since this is a modification event - {event_name}")
+            logger.debug(
+                "New image for dynamo db since this is a modification event - %s",
+                event_name,
+            )
         else:
             new_image = {}
 
@@ -57,8 +58,7 @@ def lambda_handler(event, context):
         if keys["sk"].startswith("product#"):
             qty_change = new_image.get(
                 "quantity", 0) - old_image.get("quantity", 0)
-            logger.info(
-                f"Recording the change in quantity made to dynamo db - {qty_change}")
+            logger.debug("Recording the change in quantity made to dynamo db - %s", qty_change)
             quantity_change_counter.update(
                 {
                     keys["sk"]: qty_change
@@ -66,7 +66,7 @@ def lambda_handler(event, context):
             )
 
     for k, v in quantity_change_counter.items():
-        logger.info(f"Recording change in quantity count - {k} : {v}")
+        logger.debug("Recording change in quantity count - %s : %s", k, v)
         table.update_item(
             Key={"pk": k, "sk": "totalquantity"},
             ExpressionAttributeNames={"#quantity": "quantity"},
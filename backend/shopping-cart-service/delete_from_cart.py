@@ -1,17 +1,16 @@
-import json
-import os
-
-import boto3
+import orjson
 from aws_lambda_powertools import Logger, Tracer
 
+from shared import get_table, warm_connection
+
 logger = Logger()
 tracer = Tracer()
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["TABLE_NAME"])
+table = get_table()
+warm_connection(table.meta.client)
 
 
-@logger.inject_lambda_context(log_event=True)
+@logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     """
@@ -21,12 +20,14 @@ def lambda_handler(event, context):
         records = event["Records"]
     except KeyError:
         logger.error("delete_from_total: KeyError: No records found")
-    logger.info(f"Deleting {len(records)} records")
+        return {
+            "statusCode": 400,
+        }
+    logger.info("Deleting %s records", len(records))
     with table.batch_writer() as batch:
         for item in records:
-            pk = item_body.get("pk", "")
-            logger.info(f"Deleting item - {pk} from cart")
-            item_body = json.loads(item["body"])
+            item_body = orjson.loads(item["body"])
+            logger.debug("Deleting item - %s from cart", item_body["pk"])
             batch.delete_item(
                 Key={"pk": item_body["pk"], "sk": item_body["sk"]})
 
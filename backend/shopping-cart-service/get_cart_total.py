@@ -1,19 +1,15 @@
-import json
-import os
-
-import boto3
+import orjson
 from aws_lambda_powertools import Logger, Tracer
 
-from shared import handle_decimal_type
+from shared import get_table, handle_decimal_type
 
 logger = Logger()
 tracer = Tracer()
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["TABLE_NAME"])
+table = get_table()
 
 
-@logger.inject_lambda_context(log_event=True)
+@logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     """
@@ -23,17 +19,16 @@ def lambda_handler(event, context):
         product_id = event["pathParameters"]["product_id"]
     except KeyError:
         logger.error("get_cart_total: KeyError: No product found with given product_id")
-    logger.info(f"Check the count of item#{product_id} in the shopping cart")
+    logger.info("Check the count of item#%s in the shopping cart", product_id)
     response = table.get_item(
         Key={"pk": f"product#{product_id}", "sk": "totalquantity"}
     )
-    logger.info(f"Fetching the count of item#{product_id}")
+    logger.info("Fetching the count of item#%s", product_id)
     quantity = response["Item"]["quantity"]
-    logger.info(
-        f"Total {quantity} number of item#{product_id} active in the shopping cart")
+    logger.info("Total %s number of item#%s active in the shopping cart", quantity, product_id)
     return {
         "statusCode": 200,
-        "body": json.dumps(
+        "body": orjson.dumps(
             {"product": product_id, "quantity": quantity}, default=handle_decimal_type
-        ),
+        ).decode(),
     }
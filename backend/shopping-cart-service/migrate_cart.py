@@ -1,52 +1,163 @@
-import json
 import os
-import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
+import orjson
 from aws_lambda_powertools import Logger, Metrics, Tracer
 from boto3.dynamodb.conditions import Key
-
-from shared import generate_ttl, get_cart_id, get_headers, handle_decimal_type
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from shared import (
+    generate_ttl,
+    get_cart_id,
+    get_client,
+    get_headers,
+    get_resource,
+    get_table,
+    handle_decimal_type,
+    warm_connection,
+)
 
 logger = Logger()
 tracer = Tracer()
 metrics = Metrics()
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["TABLE_NAME"])
-sqs = boto3.resource("sqs")
-queue = sqs.Queue(os.environ["DELETE_FROM_CART_SQS_QUEUE"])
+table = get_table()
+# UpdateItem goes through the low-level client with pre-marshalled values, as in add_to_cart
+client = get_client("dynamodb")
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+queue = get_resource("sqs").Queue(os.environ["DELETE_FROM_CART_SQS_QUEUE"])
+warm_connection(table.meta.client)
+warm_connection(client)
+
+SQS_BATCH_SIZE = 10  # Maximum number of entries SQS accepts in a single SendMessageBatch call
+SQS_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.05  # seconds, doubled after every attempt
+MAX_UPDATE_WORKERS = 8
+
+EXPRESSION_ATTRIBUTE_NAMES = {
+    "#quantity": "quantity",
+    "#expirationTime": "expirationTime",
+    "#productDetail": "productDetail",
+}
+UPDATE_EXPRESSION = "ADD #quantity :val SET #expirationTime = :ttl, #productDetail = :productDetail"
+
+
+def query_all_items(**kwargs):
+    """
+    Run a query against the cart table, following LastEvaluatedKey until every page has been read
+    """
+    response = table.query(**kwargs)
+    items = response["Items"]
+    while "LastEvaluatedKey" in response:
+        response = table.query(ExclusiveStartKey=response["LastEvaluatedKey"], **kwargs)
+        items.extend(response["Items"])
+    return items
 
 
-@tracer.capture_method
-def update_item(user_id, item):
+def add_quantity(user_id, item, ttl):
     """
-    Update an item in the database, adding the quantity of the passed in item to the quantity of any products already
-    existing in the cart.
+    Atomically add the item's quantity to a product already in the user's cart, returning the resulting quantity
     """
-    logger.info(f"Updating item quantity in the cart for user#{user_id}")
-    logger.info(f"Quantity updated to : ", item.get("quantity", 0))
-    ttl = generate_ttl(days=30)
-    logger.info(f"Item's time to live in cart : ", ttl)
-    table.update_item(
-        Key={"pk": f"user#{user_id}", "sk": item["sk"]},
-        ExpressionAttributeNames={
-            "#quantity": "quantity",
-            "#expirationTime": "expirationTime",
-            "#productDetail": "productDetail",
-        },
+    response = client.update_item(
+        TableName=table.name,
+        Key={"pk": {"S": f"user#{user_id}"}, "sk": {"S": item["sk"]}},
+        ExpressionAttributeNames=EXPRESSION_ATTRIBUTE_NAMES,
         ExpressionAttributeValues={
-            ":val": item["quantity"],
-            ":ttl": ttl,
-            ":productDetail": item["productDetail"],
+            ":val": {"N": str(item["quantity"])},
+            ":ttl": {"N": str(ttl)},
+            ":productDetail": serializer.serialize(item["productDetail"]),
         },
-        UpdateExpression="ADD #quantity :val SET #expirationTime = :ttl, #productDetail = :productDetail",
+        UpdateExpression=UPDATE_EXPRESSION,
+        ReturnValues="UPDATED_NEW",
     )
-    logger.info(f"Successfully updated quantity for item#{item['sk']}")
+    return deserializer.deserialize(response["Attributes"]["quantity"])
+
+
+@tracer.capture_method
+def migrate_items(user_id, items):
+    """
+    Write items to the user's cart, adding the quantity of each passed in item to the quantity of any products already
+    existing in the cart. Returns the user's resulting cart.
+    """
+    # Perform a strongly consistent read here so products added to the user's cart just before are not missed
+    user_cart = {
+        item["sk"]: item
+        for item in query_all_items(
+            KeyConditionExpression=Key("pk").eq(f"user#{user_id}")
+            & Key("sk").begins_with("product#"),
+            ProjectionExpression="sk,quantity,productDetail",
+            ConsistentRead=True,
+        )
+    }
+
+    ttl = generate_ttl(days=30)
+    logger.info("Item's time to live in cart : %s", ttl)
+    # Products already in the user's cart keep an atomic ADD so concurrent changes to their quantity aren't lost. Only
+    # products new to the cart can be batched, since BatchWriteItem can only put whole items.
+    existing_items = [item for item in items if item["sk"] in user_cart]
+    new_items = [item for item in items if item["sk"] not in user_cart]
+
+    quantities = {item["sk"]: item["quantity"] for item in new_items}
+    if existing_items:
+        with ThreadPoolExecutor(max_workers=MAX_UPDATE_WORKERS) as executor:
+            updated = executor.map(lambda item: add_quantity(user_id, item, ttl), existing_items)
+            # Consume results inside the pool so any exception is raised here
+            quantities.update(zip((item["sk"] for item in existing_items), updated))
+
+    with table.batch_writer() as batch:
+        for item in new_items:
+            batch.put_item(
+                Item={
+                    "pk": f"user#{user_id}",
+                    "sk": item["sk"],
+                    "quantity": item["quantity"],
+                    "expirationTime": ttl,
+                    "productDetail": item["productDetail"],
+                }
+            )
+    logger.info("Successfully stored %s items in the cart for user#%s", len(items), user_id)
+
+    for item in items:
+        user_cart[item["sk"]] = {
+            "sk": item["sk"],
+            "quantity": quantities[item["sk"]],
+            "productDetail": item["productDetail"],
+        }
+    return list(user_cart.values())
+
+
+@tracer.capture_method
+def queue_items_for_deletion(items):
+    """
+    Push items to the SQS queue so they are deleted from the cart asynchronously, retrying entries SQS fails to accept.
+    """
+    for i in range(0, len(items), SQS_BATCH_SIZE):
+        entries = [
+            {
+                "Id": str(n),
+                # delete_from_cart only needs the key, which also keeps Decimal attributes out of the message
+                "MessageBody": orjson.dumps({"pk": item["pk"], "sk": item["sk"]}).decode(),
+            }
+            for n, item in enumerate(items[i:i + SQS_BATCH_SIZE])
+        ]
+        for attempt in range(SQS_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(RETRY_BASE_DELAY * 2 ** attempt)
+            response = queue.send_messages(Entries=entries)
+            failed_ids = {failure["Id"] for failure in response.get("Failed", [])}
+            entries = [entry for entry in entries if entry["Id"] in failed_ids]
+            if not entries:
+                break
+            logger.warning("Failed to push %s item messages to SQS: %s", len(entries), response["Failed"])
+        else:
+            # Match send_message, which raised rather than leave items behind in the anonymous cart
+            raise RuntimeError(f"Failed to push {len(entries)} item messages to SQS")
 
 
 @metrics.log_metrics(capture_cold_start_metric=True)
-@logger.inject_lambda_context(log_event=True)
+@logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     """
@@ -54,7 +165,7 @@ def lambda_handler(event, context):
     is logged in.
     """
 
-    cart_id, _ = get_cart_id(event["headers"])
+    cart_id, _ = get_cart_id(event["headers"].get("cookie"))
     try:
         # Because this method is authorized at API gateway layer, we don't need to validate the JWT claims here
         user_id = event["requestContext"]["authorizer"]["claims"]["sub"]
@@ -65,64 +176,51 @@ def lambda_handler(event, context):
         return {
             "statusCode": 400,
             "headers": get_headers(cart_id),
-            "body": json.dumps({"message": "Invalid user"}),
+            "body": orjson.dumps({"message": "Invalid user"}).decode(),
         }
 
     # Get all cart items belonging to the user's anonymous identity
-    logger.info(
-        f"Get all cart items belonging to the user's anonymous identity - cart#{cart_id}")
+    logger.info("Get all cart items belonging to the user's anonymous identity - cart#%s", cart_id)
     response = table.query(
         KeyConditionExpression=Key("pk").eq(f"cart#{cart_id}")
         & Key("sk").begins_with("product#")
     )
     unauth_cart = response["Items"]
 
-    # Since there's no batch operation available for updating items, and there's no dependency between them, we can
-    # run them in parallel threads.
-    thread_list = []
-
-    for item in unauth_cart:
+    if unauth_cart:
         # Store items with user identifier as pk instead of "unauthenticated" cart ID
-        # Using threading library to perform updates in parallel
-        logger.info(f"Store items with user#{user_id} - {item}")
-        ddb_updateitem_thread = threading.Thread(
-            target=update_item, args=(user_id, item)
-        )
-        thread_list.append(ddb_updateitem_thread)
-        ddb_updateitem_thread.start()
+        logger.info("Store %s items with user#%s", len(unauth_cart), user_id)
+        product_list = migrate_items(user_id, unauth_cart)
 
         # Delete items with unauthenticated cart ID
         # Rather than deleting directly, push to SQS queue to handle asynchronously
-        logger.info(f"Pushing item message to SQS")
-        queue.send_message(MessageBody=json.dumps(
-            item, default=handle_decimal_type))
-
-    for ddb_thread in thread_list:
-        ddb_thread.join()  # Block main thread until all updates finished
+        logger.info("Pushing item messages to SQS")
+        queue_items_for_deletion(unauth_cart)
 
-    if unauth_cart:
         metrics.add_metric(name="CartMigrated", unit="Count", value=1)
+    else:
+        # Nothing to migrate, so return the user's cart as it is.
+        # An eventually consistent read is enough here, the result is only echoed back to the client
+        response = table.query(
+            KeyConditionExpression=Key("pk").eq(f"user#{user_id}")
+            & Key("sk").begins_with("product#"),
+            ProjectionExpression="sk,quantity,productDetail",
+        )
+        product_list = response.get("Items", [])
 
-    response = table.query(
-        KeyConditionExpression=Key("pk").eq(f"user#{user_id}")
-        & Key("sk").begins_with("product#"),
-        ProjectionExpression="sk,quantity,productDetail",
-        # Perform a strongly consistent read here to ensure we get correct values after updates
-        ConsistentRead=True,
-    )
-
-    product_list = response.get("Items", [])
     logger.info(
-        f"Migrate ${len(product_list)} from anonymous session - cart#{cart_id} to authenticated session - user#{user_id}")
+        "Migrate %s from anonymous session - cart#%s to authenticated session - user#%s",
+        len(product_list), cart_id, user_id,
+    )
     for product in product_list:
-        product.update(
-            (k, v.replace("product#", "")) for k, v in product.items() if k == "sk"
-        )
+        product["sk"] = product["sk"].replace("product#", "", 1)
 
     logger.info(
-        f"Items is cart successfully migrated from anonymous session - cart#{cart_id} to authenticated session - user#{user_id}")
+        "Items is cart successfully migrated from anonymous session - cart#%s to authenticated session - user#%s",
+        cart_id, user_id,
+    )
     return {
         "statusCode": 200,
         "headers": get_headers(cart_id),
-        "body": json.dumps({"products": product_list}, default=handle_decimal_type),
+        "body": orjson.dumps({"products": product_list}, default=handle_decimal_type).decode(),
     }
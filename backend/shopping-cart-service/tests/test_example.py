@@ -18,6 +18,22 @@ class Tests(unittest.TestCase):
     def test_headers(self):
         self.assertEqual(shared.HEADERS.get("Access-Control-Allow-Credentials"), True)
 
+    def test_get_cart_id_from_cookie(self):
+        self.assertEqual(shared.get_cart_id("cartId=abc123"), ("abc123", False))
+
+    def test_get_cart_id_generated_per_request(self):
+        first_id, first_generated = shared.get_cart_id(None)
+        second_id, second_generated = shared.get_cart_id("other=value")
+        self.assertTrue(first_generated and second_generated)
+        self.assertNotEqual(first_id, second_id)
+        self.assertNotEqual(shared.get_cart_id("other=value")[0], second_id)
+
+    def test_get_headers_sets_cart_cookie(self):
+        headers = shared.get_headers("abc123")
+        self.assertTrue(headers["Set-Cookie"].startswith("cartId=abc123;"))
+        self.assertNotIn("Set-Cookie", shared.HEADERS)
+        self.assertNotIn("Set-Cookie", shared.get_headers())
+
 
 if __name__ == "__main__":
     unittest.main()
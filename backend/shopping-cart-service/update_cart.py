@@ -1,7 +1,6 @@
-import json
 import os
 
-import boto3
+import orjson
 from aws_lambda_powertools import Logger, Metrics, Tracer
 
 from shared import (
@@ -9,6 +8,7 @@ from shared import (
     generate_ttl,
     get_cart_id,
     get_headers,
+    get_table,
     get_user_sub,
 )
 from utils import get_product_from_external_service
@@ -17,13 +17,12 @@ logger = Logger()
 tracer = Tracer()
 metrics = Metrics()
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["TABLE_NAME"])
+table = get_table()
 product_service_url = os.environ["PRODUCT_SERVICE_URL"]
 
 
 @metrics.log_metrics(capture_cold_start_metric=True)
-@logger.inject_lambda_context(log_event=True)
+@logger.inject_lambda_context
 @tracer.capture_lambda_handler
 def lambda_handler(event, context):
     """
@@ -32,13 +31,13 @@ def lambda_handler(event, context):
     """
 
     try:
-        request_payload = json.loads(event["body"])
+        request_payload = orjson.loads(event["body"])
     except KeyError:
         logger.error("update_cart: KeyError: no request payload")
         return {
             "statusCode": 400,
             "headers": get_headers(),
-            "body": json.dumps({"message": "No Request payload"}),
+            "body": orjson.dumps({"message": "No Request payload"}).decode(),
         }
 
     # retrieve the product_id that was specified in the url
@@ -49,43 +48,43 @@ def lambda_handler(event, context):
         return {
             "statusCode": 400,
             "headers": get_headers(),
-            "body": json.dumps({"message": "update_cart: product not found"}),
+            "body": orjson.dumps({"message": "update_cart: product not found"}).decode(),
         }
 
-    logger.info(f"Update quantity of items in cart for product#{product_id}")
+    logger.info("Update quantity of items in cart for product#%s", product_id)
     quantity = int(request_payload["quantity"])
-    cart_id, _ = get_cart_id(event["headers"])
+    cart_id, _ = get_cart_id(event["headers"].get("cookie"))
 
     # Because this method can be called anonymously, we need to check if there's a logged in user
     user_sub = None
     jwt_token = event["headers"].get("Authorization")
     if jwt_token:
         user_sub = get_user_sub(jwt_token)
-        logger.info(f"Authenticated user in session - user#{user_sub}")
+        logger.info("Authenticated user in session - user#%s", user_sub)
 
     try:
         product = get_product_from_external_service(product_id)
-        logger.info(f"Product details with id - {product_id} : {product}")
+        logger.debug("Product details with id - %s : %s", product_id, product)
     except NotFoundException:
         logger.info("No product found with product_id: %s", product_id)
         return {
             "statusCode": 404,
             "headers": get_headers(cart_id=cart_id),
-            "body": json.dumps({"message": "product not found"}),
+            "body": orjson.dumps({"message": "product not found"}).decode(),
         }
 
     # Prevent storing negative quantities of things
     if quantity < 0:
-        logger.error(f"Cannot save negative quantity")
+        logger.error("Cannot save negative quantity")
         return {
             "statusCode": 400,
             "headers": get_headers(cart_id),
-            "body": json.dumps(
+            "body": orjson.dumps(
                 {
                     "productId": product_id,
                     "message": "Quantity must not be lower than 0",
                 }
-            ),
+            ).decode(),
         }
 
     # Use logged in user's identifier if it exists, otherwise use the anonymous identifier
@@ -99,8 +98,10 @@ def lambda_handler(event, context):
         pk = f"cart#{cart_id}"
         ttl = generate_ttl()
 
-    logger.error(
-        f"Update quantity to - {quantity} for the product - {product_id} in cart - {pk}")
+    logger.info(
+        "Update quantity to - %s for the product - %s in cart - %s",
+        quantity, product_id, pk,
+    )
     table.put_item(
         Item={
             "pk": pk,
@@ -116,7 +117,7 @@ def lambda_handler(event, context):
     return {
         "statusCode": 200,
         "headers": get_headers(cart_id),
-        "body": json.dumps(
+        "body": orjson.dumps(
             {"productId": product_id, "quantity": quantity, "message": "cart updated"}
-        ),
+        ).decode(),
     }
@@ -1,4 +1,5 @@
 import os
+import time
 
 import requests
 from aws_lambda_powertools import Logger, Tracer
@@ -10,12 +11,22 @@ product_service_url = os.environ["PRODUCT_SERVICE_URL"]
 logger = Logger()
 tracer = Tracer()
 
+PRODUCT_CACHE_TTL = 300  # seconds
+PRODUCT_CACHE_MAXSIZE = 1024
+
+# Product details rarely change, so keep them for the lifetime of a warm container up to PRODUCT_CACHE_TTL
+product_cache = {}
+
 
 @tracer.capture_method
 def get_product_from_external_service(product_id):
     """
-    Call product API to retrieve product details
+    Call product API to retrieve product details, reusing a recent response for the same product if there is one
     """
+    cached = product_cache.get(product_id)
+    if cached and time.monotonic() - cached[1] < PRODUCT_CACHE_TTL:
+        return cached[0]
+
     response = requests.get(product_service_url + f"/product/{product_id}")
     try:
         response_dict = response.json()["product"]
@@ -23,4 +34,11 @@ def get_product_from_external_service(product_id):
         logger.error("No product found with id %s", product_id)
         raise NotFoundException
 
+    if response_dict is not None:
+        # Re-insert so the dict stays ordered by age, and evict the oldest entry once full
+        product_cache.pop(product_id, None)
+        if len(product_cache) >= PRODUCT_CACHE_MAXSIZE:
+            product_cache.pop(next(iter(product_cache)))
+        product_cache[product_id] = (response_dict, time.monotonic())
+
     return response_dict